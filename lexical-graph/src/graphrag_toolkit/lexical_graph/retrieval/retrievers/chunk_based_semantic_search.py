@@ -4,7 +4,6 @@
 import logging
 import concurrent.futures
 from typing import List, Optional, Type, Union
-from itertools import repeat
 
 from graphrag_toolkit.lexical_graph.metadata import FilterConfig
 from graphrag_toolkit.lexical_graph.retrieval.model import SearchResultCollection
@@ -45,6 +44,13 @@ class ChunkBasedSemanticSearch(TraversalBasedBaseRetriever):
         )
 
         self.share_results = share_results
+
+        # Build the per-chunk search query once so that every call sends byte-identical query text
+        self.chunk_search_cypher = f'''// chunk-based semantic graph search                                  
+        MATCH (l)-[:`__BELONGS_TO__`]->()-[:`__MENTIONED_IN__`]->(c:`__Chunk__`)
+        WHERE {self.graph_store.node_id("c.chunkId")} = $chunkId
+        RETURN DISTINCT {self.graph_store.node_id("l.statementId")} AS l LIMIT $statementLimit
+        '''
         
         # Create shared embedding cache
         self.shared_embedding_cache = SharedChunkEmbeddingCache(vector_store)
@@ -92,19 +98,12 @@ class ChunkBasedSemanticSearch(TraversalBasedBaseRetriever):
     
     def chunk_based_graph_search(self, chunk_id):
 
-
-        cypher = f'''// chunk-based semantic graph search                                  
-        MATCH (l)-[:`__BELONGS_TO__`]->()-[:`__MENTIONED_IN__`]->(c:`__Chunk__`)
-        WHERE {self.graph_store.node_id("c.chunkId")} = $chunkId
-        RETURN DISTINCT {self.graph_store.node_id("l.statementId")} AS l LIMIT $statementLimit
-        '''
-
         properties = {
             'chunkId': chunk_id,
             'statementLimit': self.args.intermediate_limit
         }
 
-        results = self.graph_store.execute_query(cypher, properties)
+        results = self.graph_store.execute_query(self.chunk_search_cypher, properties)
         statement_ids = [r['l'] for r in results]
 
         return self.get_statements_by_topic_and_source(statement_ids)
@@ -114,57 +113,86 @@ class ChunkBasedSemanticSearch(TraversalBasedBaseRetriever):
 
         logger.debug('Getting start node ids for chunk-based semantic search...')
 
-        # 1. Get initial results in parallel
-        with concurrent.futures.ThreadPoolExecutor(max_workers=len(self.initial_retrievers)) as p:
-            initial_results = list(p.map(
-                lambda r, query: r.retrieve(query), 
-                self.initial_retrievers, 
-                repeat(query_bundle)
-            ))
+        # 1. Get initial results in parallel - graph expansion is seeded with the
+        #    cosine similarity results, so start it as soon as those are available
+        #    rather than waiting for every initial retriever to complete
+        seed_indexes = [
+            i for i, r in enumerate(self.initial_retrievers) 
+            if isinstance(r, ChunkCosineSimilaritySearch)
+        ] or list(range(len(self.initial_retrievers)))
+        pending_seed_indexes = set(seed_indexes)
+
+        initial_results = [[] for _ in self.initial_retrievers]
+        graph_results = [[] for _ in self.graph_retrievers]
+        graph_futures = {}
+        graph_search_started = False
+
+        max_workers = max(1, len(self.initial_retrievers) + len(self.graph_retrievers))
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as p:
+
+            initial_futures = {
+                p.submit(r.retrieve, query_bundle): i
+                for i, r in enumerate(self.initial_retrievers)
+            }
+
+            for future in concurrent.futures.as_completed(initial_futures):
+                i = initial_futures[future]
+                initial_results[i] = future.result()
+                pending_seed_indexes.discard(i)
+
+                if pending_seed_indexes or graph_search_started or not self.share_results:
+                    continue
+
+                graph_search_started = True
+
+                seed_nodes_by_chunk_id = {}
+                for seed_index in seed_indexes:
+                    for node in initial_results[seed_index]:
+                        seed_nodes_by_chunk_id.setdefault(node.node.metadata['chunk']['chunkId'], node)
+                seed_nodes = list(seed_nodes_by_chunk_id.values())
+
+                # 2. Graph expansion if enabled (runs alongside any remaining initial retrievers)
+                if seed_nodes:
+                    for j, retriever in enumerate(self.graph_retrievers):
+                        retriever.shared_nodes = seed_nodes
+                        graph_futures[p.submit(retriever.retrieve, query_bundle)] = j
+
+            for future in concurrent.futures.as_completed(graph_futures):
+                j = graph_futures[future]
+                try:
+                    graph_results[j] = future.result()
+                except Exception as e:
+                    logger.error(f"Error in graph retriever {self.graph_retrievers[j].__class__.__name__}: {e}")
         
         if logger.isEnabledFor(logging.DEBUG) and self.args.debug_results:
             logger.debug(f'initial_results: {initial_results}')
         else:
             logger.debug(f'num initial_results: {len(initial_results)}')
 
-        # 2. Collect unique initial nodes
-        seen_chunk_ids = set()
-        initial_nodes = []
+        # 3. Collect unique initial nodes (first occurrence of each chunk wins)
+        nodes_by_chunk_id = {}
         for nodes in initial_results:
             for node in nodes:
-                chunk_id = node.node.metadata['chunk']['chunkId']
-                if chunk_id not in seen_chunk_ids:
-                    seen_chunk_ids.add(chunk_id)
-                    initial_nodes.append(node)
-
-        all_nodes = initial_nodes.copy()
+                nodes_by_chunk_id.setdefault(node.node.metadata['chunk']['chunkId'], node)
 
         if logger.isEnabledFor(logging.DEBUG) and self.args.debug_results:
-            logger.debug(f'all_nodes (before expansion): {all_nodes}')
+            logger.debug(f'all_nodes (before expansion): {list(nodes_by_chunk_id.values())}')
         else:
-            logger.debug(f'num all_nodes (before expansion): {len(all_nodes)}')
+            logger.debug(f'num all_nodes (before expansion): {len(nodes_by_chunk_id)}')
 
-        # 3. Graph expansion if enabled
-        if self.share_results and initial_nodes:
-            for retriever in self.graph_retrievers:
-                try:
-                    retriever.shared_nodes = initial_nodes
-                    graph_nodes = retriever.retrieve(query_bundle)
-                    for node in graph_nodes:
-                        chunk_id = node.node.metadata['chunk']['chunkId']
-                        if chunk_id not in seen_chunk_ids:
-                            seen_chunk_ids.add(chunk_id)
-                            all_nodes.append(node)
-                except Exception as e:
-                    logger.error(f"Error in graph retriever {retriever.__class__.__name__}: {e}")
-                    continue
+        # 4. Merge graph expansion results behind the initial nodes
+        for nodes in graph_results:
+            for node in nodes:
+                nodes_by_chunk_id.setdefault(node.node.metadata['chunk']['chunkId'], node)
+
+        all_nodes = list(nodes_by_chunk_id.values())
 
         if logger.isEnabledFor(logging.DEBUG) and self.args.debug_results:            
             logger.debug(f'all_nodes (after expansion): {all_nodes}')
         else:
             logger.debug(f'num all_nodes (after expansion): {len(all_nodes)}')
 
-        # 4. Fetch statements once
+        # 5. Fetch statements once
         if not all_nodes:
             return []
 
@@ -199,7 +227,7 @@ class ChunkBasedSemanticSearch(TraversalBasedBaseRetriever):
         search_results_collection = self._to_search_results_collection(search_results) 
         
         retriever_name = type(self).__name__
-        if retriever_name in self.args.debug_results and logger.isEnabledFor(logging.DEBUG):
+        if logger.isEnabledFor(logging.DEBUG) and retriever_name in self.args.debug_results:
             logger.debug(f'''Chunk-based semantic search results: {search_results_collection.model_dump_json(
                     indent=2, 
                     exclude_unset=True, 
@@ -53,7 +53,8 @@ class ChunkCosineSimilaritySearch(SemanticGuidedBaseChunkRetriever):
         top_k_chunks = get_top_k(
             query_bundle.embedding,
             chunk_embeddings,
-            self.top_k
+            self.top_k,
+            normalized=self.embedding_cache.embeddings_normalized
         )
         
         if logger.isEnabledFor(logging.DEBUG) and self.debug_results:
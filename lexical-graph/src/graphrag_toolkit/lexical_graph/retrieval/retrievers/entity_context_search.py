@@ -14,9 +14,13 @@ from graphrag_toolkit.lexical_graph.retrieval.processors import ProcessorBase, P
 from graphrag_toolkit.lexical_graph.retrieval.retrievers.traversal_based_base_retriever import TraversalBasedBaseRetriever
 
 from llama_index.core.schema import QueryBundle
+from pydantic import TypeAdapter
 
 logger = logging.getLogger(__name__)
 
+# Validates a whole batch of search result dicts in one pydantic-core call
+_search_results_adapter = TypeAdapter(List[SearchResult])
+
 SubRetrieverType = Union[ChunkBasedSearch, TopicBasedSearch, Type[ChunkBasedSearch], Type[TopicBasedSearch]]
 
 class EntityContextSearch(TraversalBasedBaseRetriever):
@@ -132,8 +136,9 @@ class EntityContextSearch(TraversalBasedBaseRetriever):
         for entity_context in entity_contexts[:self.args.ec_max_contexts]:
             if entity_context:
                 results = sub_retriever.retrieve(QueryBundle(query_str=entity_context))
-                for result in results:
-                    search_results.append(SearchResult.model_validate(result.metadata['result']))
+                search_results.extend(
+                    _search_results_adapter.validate_python([result.metadata['result'] for result in results])
+                )
                     
                 
         search_results_collection = self._to_search_results_collection(search_results) 
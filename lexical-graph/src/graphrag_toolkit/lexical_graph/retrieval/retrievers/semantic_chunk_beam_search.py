@@ -36,9 +36,8 @@ class SemanticChunkBeamGraphSearch(SemanticGuidedBaseChunkRetriever):
         self.beam_width = beam_width
         self.shared_nodes = shared_nodes
 
-    def get_neighbors(self, chunk_id: str) -> List[str]:
- 
-        cypher = f"""
+        # Build the neighbours query once so that every call sends byte-identical query text
+        self.neighbors_cypher = f"""
         // get chunk neighbours (semantic beam search)
         MATCH (e)-[:`__SUBJECT__`|`__OBJECT__`]->()-[:`__SUPPORTS__`]->()-[:`__BELONGS_TO__`]->()-[:`__MENTIONED_IN__`]->(c)
         WHERE {self.graph_store.node_id('c.chunkId')} = $chunkId
@@ -46,8 +45,10 @@ class SemanticChunkBeamGraphSearch(SemanticGuidedBaseChunkRetriever):
         MATCH (entity)-[:`__SUBJECT__`|`__OBJECT__`]->()-[:`__SUPPORTS__`]->()-[:`__BELONGS_TO__`]->()-[:`__MENTIONED_IN__`]->(e_neighbors)
         RETURN DISTINCT {self.graph_store.node_id('e_neighbors.chunkId')} as chunkId
         """
+
+    def get_neighbors(self, chunk_id: str) -> List[str]:
         
-        neighbors = self.graph_store.execute_query(cypher, {'chunkId': chunk_id})
+        neighbors = self.graph_store.execute_query(self.neighbors_cypher, {'chunkId': chunk_id})
         return [n['chunkId'] for n in neighbors]
 
     def beam_search(
@@ -65,7 +66,8 @@ class SemanticChunkBeamGraphSearch(SemanticGuidedBaseChunkRetriever):
         start_scores = get_top_k(
             query_embedding,
             start_embeddings,
-            len(start_chunk_ids)
+            len(start_chunk_ids),
+            normalized=self.embedding_cache.embeddings_normalized
         )
 
         # Initialize queue with start chunks
@@ -92,7 +94,8 @@ class SemanticChunkBeamGraphSearch(SemanticGuidedBaseChunkRetriever):
                     scored_neighbors = get_top_k(
                         query_embedding,
                         neighbor_embeddings,
-                        self.beam_width
+                        self.beam_width,
+                        normalized=self.embedding_cache.embeddings_normalized
                     )
 
                     # Add neighbors to queue
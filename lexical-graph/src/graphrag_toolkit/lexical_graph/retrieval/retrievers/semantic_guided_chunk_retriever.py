@@ -92,17 +92,14 @@ class SemanticGuidedChunkRetriever(SemanticGuidedBaseChunkRetriever):
         else:
             logger.debug(f'num initial_results: {len(initial_results)}')
 
-        # 2. Collect unique initial nodes
-        seen_chunk_ids = set()
-        initial_nodes = []
+        # 2. Collect unique initial nodes (first occurrence of each chunk wins)
+        nodes_by_chunk_id = {}
         for nodes in initial_results:
             for node in nodes:
-                chunk_id = node.node.metadata['chunk']['chunkId']
-                if chunk_id not in seen_chunk_ids:
-                    seen_chunk_ids.add(chunk_id)
-                    initial_nodes.append(node)
+                nodes_by_chunk_id.setdefault(node.node.metadata['chunk']['chunkId'], node)
 
-        all_nodes = initial_nodes.copy()
+        initial_nodes = list(nodes_by_chunk_id.values())
+        all_nodes = initial_nodes
 
         if logger.isEnabledFor(logging.DEBUG) and self.debug_results:
             logger.debug(f'all_nodes (before expansion): {all_nodes}')
@@ -116,13 +113,11 @@ class SemanticGuidedChunkRetriever(SemanticGuidedBaseChunkRetriever):
                     retriever.shared_nodes = initial_nodes
                     graph_nodes = retriever.retrieve(query_bundle)
                     for node in graph_nodes:
-                        chunk_id = node.node.metadata['chunk']['chunkId']
-                        if chunk_id not in seen_chunk_ids:
-                            seen_chunk_ids.add(chunk_id)
-                            all_nodes.append(node)
+                        nodes_by_chunk_id.setdefault(node.node.metadata['chunk']['chunkId'], node)
                 except Exception as e:
                     logger.error(f"Error in graph retriever {retriever.__class__.__name__}: {e}")
                     continue
+            all_nodes = list(nodes_by_chunk_id.values())
 
         if logger.isEnabledFor(logging.DEBUG) and self.debug_results:            
             logger.debug(f'all_nodes (after expansion): {all_nodes}')
@@ -145,52 +140,71 @@ class SemanticGuidedChunkRetriever(SemanticGuidedBaseChunkRetriever):
             logger.debug(f'num chunks: {len(chunks)}')
         
 
-        # 5. Create final nodes with full data
+        # 5. Create final nodes with full data, applying metadata filters (6) and 
+        #    grouping by source (7) in the same pass - nodes that would be filtered 
+        #    out are only materialised when debug_results needs to log them. 
+        #    get_chunks_query returns chunks in chunk_ids (i.e. all_nodes) order, 
+        #    omitting any it could not find, so the two sequences can be walked in 
+        #    step without building a lookup map
+        debug_results = logger.isEnabledFor(logging.DEBUG) and self.debug_results
+
+        num_final_nodes = 0
         final_nodes = []
-        chunks_map = {
-            s['result']['chunk']['chunkId']: s['result'] 
-            for s in chunks
-        }
+        filtered_nodes = []
+        source_nodes = defaultdict(list)
+
+        chunk_iter = iter(chunks)
+        next_chunk = next(chunk_iter, None)
         
         for node in all_nodes:
-            chunk_id = node.node.metadata['chunk']['chunkId']
-            if chunk_id in chunks_map:
-                result = chunks_map[chunk_id]
-                new_node = TextNode(
-                    text=result['chunk']['value'],
-                    metadata={
-                        **node.node.metadata,  # Preserve retriever metadata
-                        'statement': result['chunk'],
-                        'source': result['source']                     
-                    }
-                )
-                final_nodes.append(NodeWithScore(
-                    node=new_node,
-                    score=node.score
-                ))
+            if next_chunk is None:
+                break
 
-        if logger.isEnabledFor(logging.DEBUG) and self.debug_results:       
+            result = None
+            chunk_id = node.node.metadata['chunk']['chunkId']
+            while next_chunk is not None and next_chunk['result']['chunk']['chunkId'] == chunk_id:
+                result = result or next_chunk['result']
+                next_chunk = next(chunk_iter, None)
+
+            if result is None:
+                continue
+            
+            num_final_nodes += 1
+
+            include = self.filter_config.filter_source_metadata_dictionary(result['source']['metadata'])
+            if not include and not debug_results:
+                continue
+
+            new_node = TextNode(
+                text=result['chunk']['value'],
+                metadata={
+                    **node.node.metadata,  # Preserve retriever metadata
+                    'statement': result['chunk'],
+                    'source': result['source']                     
+                }
+            )
+            final_node = NodeWithScore(
+                node=new_node,
+                score=node.score
+            )
+
+            if debug_results:
+                final_nodes.append(final_node)
+                if include:
+                    filtered_nodes.append(final_node)
+
+            if include:
+                source_nodes[result['source']['sourceId']].append(final_node)
+
+        if debug_results:
             logger.debug(f'final_nodes: {final_nodes}')
         else:
-            logger.debug(f'num final_nodes: {len(final_nodes)}')
-
-        # 6. Apply metadata filters
-        filtered_nodes = [
-            node 
-            for node in final_nodes 
-            if self.filter_config.filter_source_metadata_dictionary(node.node.metadata['source']['metadata'])    
-        ]
+            logger.debug(f'num final_nodes: {num_final_nodes}')
 
-        if logger.isEnabledFor(logging.DEBUG) and self.debug_results:       
+        if debug_results:
             logger.debug(f'filter_nodes: {filtered_nodes}')
         else:
-            logger.debug(f'num filter_nodes: {len(filtered_nodes)}')
-
-        # 7. Group by source for better context
-        source_nodes = defaultdict(list)
-        for node in filtered_nodes:
-            source_id = node.node.metadata['source']['sourceId']
-            source_nodes[source_id].append(node)
+            logger.debug(f'num filter_nodes: {sum(len(nodes) for nodes in source_nodes.values())}')
 
         # 8. Create final ordered list
         ordered_nodes = []
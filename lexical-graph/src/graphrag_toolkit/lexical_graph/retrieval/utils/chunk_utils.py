@@ -1,10 +1,11 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 
+import math
 import numpy as np
 import threading
 import logging
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple, Union
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 
 from graphrag_toolkit.lexical_graph.storage.graph.graph_utils import node_result
@@ -12,44 +13,116 @@ from graphrag_toolkit.lexical_graph.storage.vector import VectorStore
 
 logger = logging.getLogger(__name__)
 
-def cosine_similarity(query_embedding, chunk_embeddings):
+try:
+    import simsimd
+    _HAS_SIMSIMD = True
+except ImportError:
+    # Optional - install with 'pip install simsimd' for SIMD cosine kernels
+    _HAS_SIMSIMD = False
+
+_SIMSIMD_DTYPES = (np.float32, np.float16, np.int8)
+
+# Sentinel for single-lookup dict.get() probes
+_MISSING = object()
+
+# Scale applied to unit-length embeddings when they are quantized to int8
+INT8_SCALE = 127
+
+# Packed (SoA) form of a set of chunk embeddings: an (N,d) matrix and the N chunk ids of its rows
+ChunkEmbeddings = Tuple[np.ndarray, List[str]]
+
+def to_chunk_embeddings(chunk_embeddings:Union[ChunkEmbeddings, Dict[str, np.ndarray]]) -> ChunkEmbeddings:
+
+    if isinstance(chunk_embeddings, dict):
+        if not chunk_embeddings:
+            return np.empty((0, 0)), []
+        chunk_ids, embeddings = zip(*chunk_embeddings.items())
+        return np.asarray(embeddings, dtype=np.float32), list(chunk_ids)
     
-    if not chunk_embeddings:
+    return chunk_embeddings
+
+def _simsimd_cosine_similarity(query_embedding, query_sq_norm, chunk_embeddings):
+
+    # SimSIMD needs the query in the same dtype as the matrix
+    if chunk_embeddings.dtype == np.int8:
+        query_embedding = query_embedding * (INT8_SCALE / math.sqrt(query_sq_norm))
+        query_embedding = np.clip(np.round(query_embedding), -INT8_SCALE, INT8_SCALE).astype(np.int8)
+    else:
+        query_embedding = query_embedding.astype(chunk_embeddings.dtype, copy=False)
+
+    distances = simsimd.cdist(query_embedding[None, :], np.ascontiguousarray(chunk_embeddings), metric='cosine')
+    return 1 - np.asarray(distances).ravel()
+
+def cosine_similarity(query_embedding, chunk_embeddings, normalized=False):
+
+    chunk_embeddings, chunk_ids = to_chunk_embeddings(chunk_embeddings)
+    
+    if not chunk_ids:
         return np.array([]), []
 
-    query_embedding = np.array(query_embedding)
-    chunk_ids, chunk_embeddings = zip(*chunk_embeddings.items())
-    chunk_embeddings = np.array(chunk_embeddings)
+    query_embedding = np.ascontiguousarray(query_embedding, dtype=np.float32)
+
+    query_sq_norm = float(np.vdot(query_embedding, query_embedding))
+    if query_sq_norm == 0:
+        return np.zeros(len(chunk_ids)), chunk_ids
 
-    dot_product = np.dot(chunk_embeddings, query_embedding)
-    norms = np.linalg.norm(chunk_embeddings, axis=1) * np.linalg.norm(query_embedding)
+    if _HAS_SIMSIMD and chunk_embeddings.dtype in _SIMSIMD_DTYPES:
+        return _simsimd_cosine_similarity(query_embedding, query_sq_norm, chunk_embeddings), chunk_ids
+
+    scale = 1.0
+    if chunk_embeddings.dtype == np.int8:
+        # Widen int8-quantized embeddings for scoring; cosine is scale invariant, and 
+        # the unit-vector path below undoes the quantization scale
+        chunk_embeddings = chunk_embeddings.astype(np.float32)
+        scale = 1.0 / INT8_SCALE
+
+    if normalized:
+        # Chunk embeddings are already unit length, so cosine is a plain dot product
+        similarities = chunk_embeddings @ (query_embedding * (scale / math.sqrt(query_sq_norm)))
+        return similarities, chunk_ids
+
+    # Squared row norms in one pass, and a single sqrt over the combined norms
+    dot_product = chunk_embeddings @ query_embedding
+    chunk_sq_norms = np.einsum('ij,ij->i', chunk_embeddings, chunk_embeddings)
     
-    similarities = dot_product / norms
+    similarities = dot_product / np.sqrt(chunk_sq_norms * query_sq_norm)
     return similarities, chunk_ids
 
-def get_top_k(query_embedding, chunk_embeddings, top_k):
+def get_top_k(query_embedding, chunk_embeddings, top_k, normalized=False):
    
-    logger.debug(f'chunk_embeddings: {chunk_embeddings}')
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f'chunk_embeddings: {chunk_embeddings}')
+
+    chunk_embeddings = to_chunk_embeddings(chunk_embeddings)
 
-    if not chunk_embeddings:
+    if not chunk_embeddings[1]:
         return []  
     
-    similarities, chunk_ids = cosine_similarity(query_embedding, chunk_embeddings)
+    similarities, chunk_ids = cosine_similarity(query_embedding, chunk_embeddings, normalized=normalized)
 
-    logger.debug(f'similarities: {similarities}')
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f'similarities: {similarities}')
     
     if len(similarities) == 0:
         return []
 
     top_k = min(top_k, len(similarities))
-    top_indices = np.argsort(similarities)[::-1][:top_k]
+    if top_k <= 0:
+        return []
+    elif top_k < len(similarities):
+        # O(n) partition around the k-th largest score, then sort just the top_k slice
+        top_indices = np.argpartition(similarities, -top_k)[-top_k:]
+        top_indices = top_indices[np.argsort(-similarities[top_indices])]
+    else:
+        top_indices = np.argsort(-similarities)
 
-    top_chunk_ids = [chunk_ids[idx] for idx in top_indices]
-    top_similarities = similarities[top_indices]
-    return list(zip(top_similarities, top_chunk_ids))
+    # Only touch the top_k winners: no N-length id array or score copy
+    return [(similarities[i], chunk_ids[i]) for i in top_indices.tolist()]
 
 def get_chunks_query(graph_store, chunk_ids):
 
+    # Results are returned in chunk_ids order; ids with no matching chunk are omitted
+
     cypher = f'''
     MATCH (chunk:`__Chunk__`)-[:`__EXTRACTED_FROM__`]->(source:`__Source__`) WHERE {graph_store.node_id("chunk.chunkId")} in $chunk_ids
     RETURN {{
@@ -62,55 +135,159 @@ def get_chunks_query(graph_store, chunk_ids):
     '''
     params = {'chunk_ids': chunk_ids}
     chunks = graph_store.execute_query(cypher, params)
-    results = []
-    for chunk_id in chunk_ids:
-                for chunk in chunks:
-                    if chunk['result']['chunk']['chunkId'] == chunk_id:
-                        results.append(chunk)
-    return results
+    chunks_by_id = {chunk['result']['chunk']['chunkId']: chunk for chunk in chunks}
+    return [chunks_by_id[chunk_id] for chunk_id in chunk_ids if chunk_id in chunks_by_id]
 
 class SharedChunkEmbeddingCache:
 
-    def __init__(self, vector_store:VectorStore):
-        self._cache: Dict[str, np.ndarray] = {}
-        self._lock = threading.Lock()
+    # Embeddings are L2-normalized on insertion, so they can be scored with a plain dot product
+    embeddings_normalized = True
+
+    def __init__(self, vector_store:VectorStore, initial_capacity:int=1024, quantize:bool=False, max_entries:Optional[int]=100000):
+        # Embeddings are held in a single contiguous (capacity, d) buffer - rows [0, _count) 
+        # are in use, and the row map gives each chunk id's row. Readers take the 
+        # (row map, buffer) snapshot without locking; writers either append in place 
+        # within the current buffer's capacity, or build a new snapshot (grow, evict) 
+        # and swap it in atomically, so a reader's snapshot is always self-consistent
+        self._snapshot: Tuple[Dict[str, int], Optional[np.ndarray]] = ({}, None)
+        self._count = 0
+        self._lock = threading.RLock()
         self.vector_store = vector_store
+        self.initial_capacity = initial_capacity
+        # Once the cache holds more than max_entries embeddings, the oldest are evicted (None = unbounded)
+        self.max_entries = max_entries
+        # Store embeddings as int8 (scaled by INT8_SCALE) - 4x smaller than float32, at a small cost in score precision
+        self.quantize = quantize
 
     @retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10),retry=retry_if_exception_type(Exception))
     def _fetch_embeddings(self, chunk_ids: List[str]) -> Dict[str, np.ndarray]:
        
         embeddings = self.vector_store.get_index('chunk').get_embeddings(chunk_ids)
         return {
-            e['chunk']['chunkId']: np.array(e['embedding']) 
+            e['chunk']['chunkId']: self._normalize(np.asarray(e['embedding'], dtype=np.float32))
             for e in embeddings
         }
 
-    def get_embeddings(self, chunk_ids: List[str]) -> Dict[str, np.ndarray]:
+    def _normalize(self, embedding: np.ndarray) -> np.ndarray:
+        embedding /= (np.linalg.norm(embedding) or 1.0)
+        if self.quantize:
+            return np.clip(np.round(embedding * INT8_SCALE), -INT8_SCALE, INT8_SCALE).astype(np.int8)
+        return embedding
+
+    def _append_rows(self, new_ids: List[str], rows: np.ndarray) -> None:
+
+        # Must be called holding self._lock
+        row_of, matrix = self._snapshot
+        
+        # Another writer may have added some of these ids since the rows were prepared
+        fresh = [i for i, sid in enumerate(new_ids) if sid not in row_of]
+        if not fresh:
+            return
+        if len(fresh) < len(new_ids):
+            new_ids, rows = [new_ids[i] for i in fresh], rows[fresh]
+        
+        count = self._count
+        required = count + len(new_ids)
+        new_snapshot = False
+
+        if self.max_entries and required > self.max_entries:
+            # Evict the oldest entries (dicts keep insertion order) into a compacted copy, 
+            # shrinking to 3/4 of max_entries so that compaction is amortised across appends
+            if len(new_ids) > self.max_entries:
+                # A batch larger than the cache only keeps its newest rows
+                new_ids, rows = new_ids[-self.max_entries:], rows[-self.max_entries:]
+            keep = min(len(row_of), max(0, (self.max_entries * 3) // 4 - len(new_ids)))
+            survivors = list(row_of)[-keep:] if keep else []
+            # Leave headroom for later appends, up to max_entries, so the next few don't regrow the buffer
+            capacity = max(self.initial_capacity, min(self.max_entries, 2 * (keep + len(new_ids))))
+            compacted = np.empty((capacity, rows.shape[1]), dtype=rows.dtype)
+            if survivors:
+                compacted[:keep] = matrix[[row_of[sid] for sid in survivors]]
+            logger.debug(f'Evicting {count - keep} embeddings from cache')
+            row_of, matrix, count = {sid: row for row, sid in enumerate(survivors)}, compacted, keep
+            required = count + len(new_ids)
+            new_snapshot = True
+        elif matrix is None:
+            row_of, matrix = {}, np.empty((max(self.initial_capacity, required), rows.shape[1]), dtype=rows.dtype)
+            new_snapshot = True
+        elif required > len(matrix):
+            # Grow by doubling so appends are amortised O(1) per row
+            capacity = len(matrix)
+            while capacity < required:
+                capacity *= 2
+            grown = np.empty((capacity, matrix.shape[1]), dtype=matrix.dtype)
+            grown[:count] = matrix[:count]
+            row_of, matrix = dict(row_of), grown
+            new_snapshot = True
+
+        # Write the rows before publishing their ids, so readers never see an unwritten row
+        matrix[count:required] = rows
+        for offset, sid in enumerate(new_ids):
+            row_of[sid] = count + offset
+        self._count = required
+
+        if new_snapshot:
+            self._snapshot = (row_of, matrix)
 
-        missing_ids = []
-        cached_embeddings = {}
+    def _update_cache(self, chunk_ids: List[str]) -> Dict[str, np.ndarray]:
+
+        new_embeddings = self._fetch_embeddings(chunk_ids)
+
+        # Stack the new rows outside the lock, so writers only serialise on the copy into the cache
+        row_of, _ = self._snapshot
+        new_ids = [sid for sid in new_embeddings if sid not in row_of]
+        if new_ids:
+            rows = np.array([new_embeddings[sid] for sid in new_ids])
+            assert rows.dtype == (np.int8 if self.quantize else np.float32), f'Unexpected embedding dtype: {rows.dtype}'
+            with self._lock:
+                self._append_rows(new_ids, rows)
+        
+        return new_embeddings
+
+    def get_embeddings(self, chunk_ids: List[str]) -> ChunkEmbeddings:
+
+        unique_ids = list(dict.fromkeys(chunk_ids))
 
         logger.debug(f'chunk_ids: {chunk_ids}')
 
-        # Check cache first
-        for sid in chunk_ids:
-            if sid in self._cache:
-                cached_embeddings[sid] = self._cache[sid]
-            else:
-                missing_ids.append(sid)
+        row_of, matrix = self._snapshot
+
+        # Check cache first - set.difference() probes the dict once per requested id in C
+        missing_ids = list(set(unique_ids).difference(row_of))
 
         logger.debug(f'missing_ids: {missing_ids}')
 
         # Fetch missing embeddings with retry
+        new_embeddings = {}
         if missing_ids:
             try:
-                new_embeddings = self._fetch_embeddings(missing_ids)
-                with self._lock:
-                    self._cache.update(new_embeddings)
-                    cached_embeddings.update(new_embeddings)
+                new_embeddings = self._update_cache(missing_ids)
             except Exception as e:
                 logger.error(f"Failed to fetch embeddings after retries: {e}")
                 # Return what we have from cache
-                logger.warning(f"Returning {len(cached_embeddings)} cached embeddings out of {len(chunk_ids)} requested")
+                logger.warning(f"Returning {len(unique_ids) - len(missing_ids)} cached embeddings out of {len(chunk_ids)} requested")
+
+        # Gather in request order - cached rows come from the snapshot taken above (a 
+        # concurrent eviction may already have dropped them from the live cache), newly 
+        # fetched ones straight from the fetch results
+        if not missing_ids:
+            if not unique_ids:
+                return np.empty((0, 0)), []
+            return matrix[[row_of[sid] for sid in unique_ids]], unique_ids
+
+        found_ids = []
+        embeddings = []
+        for sid in unique_ids:
+            embedding = new_embeddings.get(sid, _MISSING)
+            if embedding is _MISSING:
+                row = row_of.get(sid, _MISSING)
+                if row is _MISSING:
+                    continue
+                embedding = matrix[row]
+            found_ids.append(sid)
+            embeddings.append(embedding)
+
+        if not found_ids:
+            return np.empty((0, 0)), []
 
-        return cached_embeddings
\ No newline at end of file
+        return np.array(embeddings), found_ids
\ No newline at end of file
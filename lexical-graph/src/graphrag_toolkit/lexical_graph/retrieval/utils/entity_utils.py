@@ -1,7 +1,10 @@
 # Copyright Amazon.com, Inc. or its affiliates. All Rights Reserved.
 # SPDX-License-Identifier: Apache-2.0
 import logging
-from typing import List, Dict
+import functools
+from collections import defaultdict
+from operator import attrgetter
+from typing import List, Dict, Tuple
 
 from graphrag_toolkit.lexical_graph import GraphRAGConfig
 from graphrag_toolkit.lexical_graph.retrieval.model import ScoredEntity
@@ -12,8 +15,14 @@ from llama_index.core.schema import QueryBundle, NodeWithScore, TextNode
 
 logger = logging.getLogger(__name__)
 
+_text_and_score = attrgetter('text', 'score')
+
+@functools.lru_cache(maxsize=8192)
+def _entity_token_cached(value:str, classification:str) -> str:
+    return f'{value.lower()} ({classification.lower()})'
+
 def _get_entity_token(entity):
-    return f'{entity.entity.value.lower()} ({entity.entity.classification.lower()})'
+    return _entity_token_cached(entity.entity.value, entity.entity.classification)
 
 def _get_reranked_entity_tokens_model(entities:List[ScoredEntity], keywords:List[str]) -> Dict[str, float]:
 
@@ -28,19 +37,20 @@ def _get_reranked_entity_tokens_model(entities:List[ScoredEntity], keywords:List
         rank_query
     )
 
-    reranked_entity_names =  {
-        reranked_value.text : reranked_value.score
-        for reranked_value in reranked_values
-    }
+    reranked_entity_names = dict(map(_text_and_score, reranked_values))
 
     return reranked_entity_names
 
+@functools.lru_cache(maxsize=256)
+def _score_entity_tokens_tfidf(entity_names:Tuple[str, ...], keywords:Tuple[str, ...]) -> Dict[str, float]:
+    return score_values_with_tfidf(list(entity_names), list(keywords))
+
 def _get_reranked_entity_tokens_tfidf(entities:List[ScoredEntity], keywords:List[str]) -> Dict[str, float]:
     
-    entity_names = [_get_entity_token(entity) for entity in entities]
-    reranked_entity_names = score_values_with_tfidf(entity_names, keywords)
+    entity_names = tuple(_get_entity_token(entity) for entity in entities)
+    reranked_entity_names = _score_entity_tokens_tfidf(entity_names, tuple(keywords))
 
-    return reranked_entity_names
+    return dict(reranked_entity_names)
 
 def _get_reranked_entity_tokens(entities:List[ScoredEntity], keywords:List[str], reranker:str) -> Dict[str, float]:
 
@@ -51,23 +61,27 @@ def _get_reranked_entity_tokens(entities:List[ScoredEntity], keywords:List[str],
 
     results = _get_reranked_entity_tokens_tfidf(entities, keywords)
 
-    results = {
-        k:round(v, 4) for k,v in results.items()
-    }
-
-    logger.debug(f'reranking ({reranker}): [keywords: {keywords}, reranked_entity_names: {results}]')
+    if logger.isEnabledFor(logging.DEBUG):
+        rounded_results = {
+            k:round(v, 4) for k,v in results.items()
+        }
+        logger.debug(f'reranking ({reranker}): [keywords: {keywords}, reranked_entity_names: {rounded_results}]')
 
     return results
 
 def _get_reranked_entities(entities:List[ScoredEntity], reranked_entity_tokens:Dict[str, float]) -> List[ScoredEntity]:
 
-    entity_id_map = {}
+    entities_by_token = defaultdict(list)
+    for entity in entities:
+        entities_by_token[_get_entity_token(entity)].append(entity)
+
+    reranked_entity_ids = set()
 
     for reranked_entity_token, reranking_score in reranked_entity_tokens.items():
-        for entity in entities:
-            if _get_entity_token(entity) == reranked_entity_token and entity.entity.entityId not in entity_id_map:
+        for entity in entities_by_token.get(reranked_entity_token, []):
+            if entity.entity.entityId not in reranked_entity_ids:
                 entity.reranking_score = reranking_score
-                entity_id_map[entity.entity.entityId] = None
+                reranked_entity_ids.add(entity.entity.entityId)
                 
 
     entities.sort(key=lambda e: (-e.reranking_score, -e.score))
@@ -81,5 +95,7 @@ def _get_reranked_entities(entities:List[ScoredEntity], reranked_entity_tokens:D
     return entities
 
 def rerank_entities(entities:List[ScoredEntity], query_bundle:QueryBundle, keywords:List[str], reranker:str) -> List[ScoredEntity]:
-    all_reranked_entity_tokens = _get_reranked_entity_tokens(entities, [query_bundle.query_str] + keywords, reranker)
+    query_str = query_bundle.query_str
+    rank_keywords = [query_str] + [keyword for keyword in keywords if keyword != query_str]
+    all_reranked_entity_tokens = _get_reranked_entity_tokens(entities, rank_keywords, reranker)
     return _get_reranked_entities(entities, all_reranked_entity_tokens)
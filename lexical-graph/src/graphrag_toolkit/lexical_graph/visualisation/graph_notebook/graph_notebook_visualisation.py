@@ -2,13 +2,16 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import argparse
+import functools
+import re
 import pandas as pd
 import json
 
+from itertools import chain
 from json import JSONDecodeError
+from types import SimpleNamespace
 from typing import Optional, List, Union, Dict
 
-from graphrag_toolkit.lexical_graph.retrieval.model import SearchResult, EntityContexts
 from graphrag_toolkit.lexical_graph.tenant_id import to_tenant_id
 from graphrag_toolkit.lexical_graph.metadata import FilterConfig
 from graphrag_toolkit.lexical_graph.storage.graph.graph_utils import filter_config_to_opencypher_filters, search_string_from
@@ -16,6 +19,8 @@ from graphrag_toolkit.lexical_graph.storage.graph.graph_utils import filter_conf
 from llama_index.core.vector_stores.types import FilterCondition, FilterOperator, MetadataFilter, MetadataFilters
 
 LABELS_TO_REFORMAT = ['Source', 'Chunk', 'Topic', 'Statement', 'Fact', 'Entity']
+# Matches the same '__<Label>' prefixes as label.startswith(f'__{label}'), tenant suffixes included
+_LABEL_RE = re.compile(f"__({'|'.join(LABELS_TO_REFORMAT)})")
 
 FILTER_TYPE = Union[FilterConfig, List[Dict], Dict]
 
@@ -54,141 +59,177 @@ def to_filter_config(filter:FILTER_TYPE) -> FilterConfig:
             )
         )
 
-def format_params(params):
-    
-    params_strs = [
-        (str(param)
-        .replace("'startId'", 'startId')
-        .replace("'intermediateIds'", 'intermediateIds')
-        .replace("'endId'", 'endId')
-        .replace("'endIds'", 'endIds'))
-        for param in params
-    ]
-    
-    return f'[{",".join(s for s in set(params_strs))}]'
-
-def for_each_disjoint_unique(values):
-    params = []
-    for idx, value in enumerate(values[:-1]):
-        other_values = values[idx+1:]
-        params.append({'startId': value, 'endIds': other_values})
-    return params
-
 def get_query_params(nodes):
     
-    source_topic_ids = []
-    topic_statement_ids = []
+    # Keyed by id tuples, so duplicates across nodes are merged as they are found
+    source_topic_ids = {}
+    topic_statement_ids = {}
     statement_ids = []
-    entity_ids = set()
-    entity_entity_ids = []
+    entity_ids = {} # insertion-ordered, so the query parameters are deterministic
+    entity_entity_ids = {}
     
     def get_chunk_ids(topic):
-        chunk_ids = [
-            statement.chunkId
-            for statement in topic.statements
-        ]
-        
-        return list(set(chunk_ids))
+        # De-duplicated in first-seen order
+        return list(dict.fromkeys(
+            statement.get('chunkId')
+            for statement in topic.get('statements', [])
+        ))
     
+    # Node metadata holds already-validated model dumps (with unset and default fields 
+    # excluded), so walk the dicts directly rather than re-validating them
     for n in nodes:
         
-        search_result = SearchResult.model_validate(n.metadata['result'])
-        entity_contexts = EntityContexts.model_validate(n.metadata['entity_contexts'])
+        search_result = n.metadata['result']
+        entity_contexts = n.metadata['entity_contexts']
+        
+        context_entity_ids = [
+            [entity['entity']['entityId'] for entity in entity_context.get('entities', [])]
+            for entity_context in entity_contexts.get('contexts', [])
+        ]
         
-        for entity_context in entity_contexts.contexts:
-            prev_entity_id = None
-            for entity in entity_context.entities:
-                entity_id = entity.entity.entityId
-                entity_ids.add(entity_id)
-                if prev_entity_id:
-                    entity_entity_ids.append({'startId': prev_entity_id, 'endId': entity_id})
-                prev_entity_id = entity_id
+        entity_ids.update(dict.fromkeys(chain.from_iterable(context_entity_ids)))
+        # Consecutive entities in each context are linked
+        entity_entity_ids.update(dict.fromkeys(chain.from_iterable(
+            zip(ids, ids[1:]) for ids in context_entity_ids
+        )))
         
-        source_id = search_result.source.sourceId
+        source_id = search_result['source']['sourceId']
         
-        for topic in search_result.topics:
+        for topic in search_result.get('topics', []):
         
-            source_topic_ids.append({
-                'startId': source_id, 
-                'intermediateIds': get_chunk_ids(topic), 
-                'endId': topic.topicId
-            })
+            topic_id = topic['topicId']
+        
+            # Nodes can share a source and topic but hold different statements, so merge 
+            # the chunk ids of every occurrence of the pair
+            chunk_ids = source_topic_ids.setdefault((source_id, topic_id), {})
+            chunk_ids.update(dict.fromkeys(get_chunk_ids(topic)))
             
-            for statement in topic.statements:
+            for statement in topic.get('statements', []):
             
-                topic_statement_ids.append({'startId': topic.topicId, 'endId': statement.statementId})
-                statement_ids.append(statement.statementId)
+                statement_id = statement.get('statementId')
+                topic_statement_ids[(topic_id, statement_id)] = None
+                statement_ids.append(statement_id)
                              
+    # Canonical ordering, so the same results always produce the same query parameters
+    statement_ids = sorted(set(statement_ids))
     
     query_parameters = { 
-        'source_topic_ids': source_topic_ids,
-        'topic_statement_ids': topic_statement_ids,
-        'statement_id_sets': for_each_disjoint_unique(statement_ids),
+        'source_topic_ids': [
+            {'startId': source_id, 'intermediateIds': list(chunk_ids), 'endId': topic_id}
+            for (source_id, topic_id), chunk_ids in source_topic_ids.items()
+        ],
+        'topic_statement_ids': [
+            {'startId': topic_id, 'endId': statement_id}
+            for (topic_id, statement_id) in topic_statement_ids
+        ],
+        'statement_ids': statement_ids,
         'entity_statement_ids': [
             {'startId': entity_id, 'endIds': statement_ids }
             for entity_id in entity_ids
         ],
         'entity_ids': list(entity_ids),
-        'entity_entity_ids': entity_entity_ids
+        'entity_entity_ids': [
+            {'startId': start_id, 'endId': end_id}
+            for (start_id, end_id) in sorted(entity_entity_ids)
+        ]
     }
     
     return query_parameters
 
-def get_query(query_parameters, include_sources=True):
-    
-    sources_cypher = '' if not include_sources else f'''
-    UNWIND {format_params(query_parameters["source_topic_ids"])} AS source_topic_ids
+# Parameter lists are bound server-side ($name), so the query text is the same for every
+# result set and the engine can reuse its query plan. Each query is built by joining its 
+# branches with UNION
+
+_UNION = '''
+    UNION
+'''
+
+_SOURCE_TOPIC_CYPHER = '''
+    UNWIND $source_topic_ids AS source_topic_ids
     MATCH p=(s)<-[:`__EXTRACTED_FROM__`]-(c)<-[:`__MENTIONED_IN__`]-(t)
     WHERE id(s) = source_topic_ids.startId
     AND id(c) in source_topic_ids.intermediateIds
     AND id(t) = source_topic_ids.endId
-    RETURN p
-    UNION
-    '''
-    
-    cypher = f'''{sources_cypher}
-    UNWIND {format_params(query_parameters["topic_statement_ids"])} AS topic_statement_ids
+    RETURN p'''
+
+_TOPIC_STATEMENT_CYPHER = '''
+    UNWIND $topic_statement_ids AS topic_statement_ids
     MATCH p=(t)<-[:`__BELONGS_TO__`]-(l)<-[:`__SUPPORTS__`]-()
     WHERE id(t) = topic_statement_ids.startId AND id(l) = topic_statement_ids.endId
-    RETURN p
-    UNION
-    UNWIND {format_params(query_parameters["statement_id_sets"])} AS statement_id_sets
-    CALL {{
-    WITH statement_id_sets
+    RETURN p'''
+
+_STATEMENT_STATEMENT_CYPHER = '''
+    UNWIND $statement_ids AS statement_id
+    CALL {
+    WITH statement_id
     MATCH p=(l)<-[:`__SUPPORTS__`]-()<-[:`__SUBJECT__`|`__OBJECT__`]-()
             -[:`__SUBJECT__`|`__OBJECT__`]->()-[:`__SUPPORTS__`]->(ll)
-    WHERE id(l) = statement_id_sets.startId AND id(ll) IN statement_id_sets.endIds
+    WHERE id(l) = statement_id AND id(ll) IN $statement_ids AND id(l) < id(ll)
     RETURN p LIMIT 10
-    }}
-    RETURN p
-    UNION
-    UNWIND {format_params(query_parameters["entity_statement_ids"])} AS entity_statement_ids
-    CALL {{
+    }
+    RETURN p'''
+
+_ENTITY_STATEMENT_CYPHER = '''
+    UNWIND $entity_statement_ids AS entity_statement_ids
+    CALL {
     WITH entity_statement_ids
     MATCH p=(e)-[:`__SUBJECT__`|`__OBJECT__`]->()-[:`__SUPPORTS__`]->(f)
     WHERE id(e) = entity_statement_ids.startId AND id(f) IN entity_statement_ids.endIds
     RETURN p LIMIT 10
-    }}
-    RETURN p
-    '''
-    
-    return cypher
+    }
+    RETURN p'''
 
-def get_entity_context_query(query_parameters):
-    
-    cypher = f'''
+_ENTITY_CYPHER = '''
     MATCH p=(e)
-    WHERE id(e) in {str(query_parameters["entity_ids"])} 
-    RETURN p
-    UNION
-    UNWIND {format_params(query_parameters["entity_entity_ids"])} AS entity_entity_ids
+    WHERE id(e) in $entity_ids 
+    RETURN p'''
+
+_ENTITY_ENTITY_CYPHER = '''
+    UNWIND $entity_entity_ids AS entity_entity_ids
     MATCH p=(e1)-->(e2)
     WHERE id(e1) = entity_entity_ids.startId
     AND id(e2) = entity_entity_ids.endId
-    RETURN p
-    '''
+    RETURN p'''
+
+def get_query(query_parameters, include_sources=True):
     
-    return cypher
+    # Only add branches that have something to match - an UNWIND over an empty 
+    # list still has to be planned, and returns nothing
+    parts = []
+    params = {}
+    
+    if include_sources and query_parameters['source_topic_ids']:
+        parts.append(_SOURCE_TOPIC_CYPHER)
+        params['source_topic_ids'] = query_parameters['source_topic_ids']
+    
+    if query_parameters['topic_statement_ids']:
+        parts.append(_TOPIC_STATEMENT_CYPHER)
+        params['topic_statement_ids'] = query_parameters['topic_statement_ids']
+    
+    if len(query_parameters['statement_ids']) > 1:
+        parts.append(_STATEMENT_STATEMENT_CYPHER)
+        params['statement_ids'] = query_parameters['statement_ids']
+    
+    if query_parameters['entity_statement_ids'] and query_parameters['statement_ids']:
+        parts.append(_ENTITY_STATEMENT_CYPHER)
+        params['entity_statement_ids'] = query_parameters['entity_statement_ids']
+    
+    return _UNION.join(parts), params
+
+def get_entity_context_query(query_parameters):
+    
+    parts = []
+    params = {}
+    
+    if query_parameters['entity_ids']:
+        parts.append(_ENTITY_CYPHER)
+        params['entity_ids'] = query_parameters['entity_ids']
+    
+    if query_parameters['entity_entity_ids']:
+        parts.append(_ENTITY_ENTITY_CYPHER)
+        params['entity_entity_ids'] = query_parameters['entity_entity_ids']
+    
+    return _UNION.join(parts), params
 
 def get_schema_query(tenant_id):
 
@@ -211,11 +252,13 @@ def get_sources_query(tenant_id, source_ids:Optional[List[str]]=None, filter:Opt
     label = tenant_id.format_label('__Source__')
     
     where_clauses = []
+    params = {}
     
     if filter:
         where_clauses.append(filter_config_to_opencypher_filters(to_filter_config(filter)))
     if source_ids:
-        where_clauses.append(f'(id(source) in {str(source_ids)})')
+        where_clauses.append('(id(source) in $source_ids)')
+        params['source_ids'] = list(source_ids)
     
     where_clause = '' if not where_clauses else f"WHERE {' OR '.join(where_clauses)}"
         
@@ -227,27 +270,32 @@ def get_sources_query(tenant_id, source_ids:Optional[List[str]]=None, filter:Opt
     RETURN p LIMIT 1000
     '''
     
-    return cypher
+    return cypher, params
 
 def get_entity_paths_query(tenant_id, entity_1, entity_2:Optional[str]=None, depth:Optional[int]=3):
 
     label = tenant_id.format_label('__Entity__')
 
+    # Variable-length bounds can't be parameterised, but depth is limited to 1-3, 
+    # so there are only a few distinct query texts per tenant
+    params = {'entity_1': search_string_from(entity_1)}
+
     if entity_2:
         cypher = f"""MATCH p=(e1:{label})-[:`__RELATION__`*1..{depth}]-(e2:{label})
-        WHERE e1.search_str starts with '{search_string_from(entity_1)}'
-        AND e2.search_str starts with '{search_string_from(entity_2)}'
+        WHERE e1.search_str starts with $entity_1
+        AND e2.search_str starts with $entity_2
         AND e1 <> e2
         RETURN p LIMIT 1000
         """
+        params['entity_2'] = search_string_from(entity_2)
     else:
         cypher = f"""MATCH p=(e1:{label})-[:`__RELATION__`*1..{depth}]-()
-        WHERE e1.search_str starts with '{search_string_from(entity_1)}'
+        WHERE e1.search_str starts with $entity_1
         RETURN p LIMIT 1000
         """
 
     
-    return cypher
+    return cypher, params
 
 def get_entities_query(tenant_id):
 
@@ -259,220 +307,267 @@ def get_entities_query(tenant_id):
 
     return cypher
 
-class GraphNotebookVisualisation():
-
-    def __init__(self, display_edge_labels=False, formatting_config=None, nb_classic=False):
-        self.display_edge_labels = display_edge_labels
-        self.formatting_config = formatting_config
-        self.nb_classic = nb_classic
+# Paths repeat the same handful of labels and relationship types, so memoise the rewrites
+@functools.lru_cache(maxsize=1024)
+def _reformat_label(l):
+    m = _LABEL_RE.match(l)
+    return m.group(1) if m else l
 
-    def _get_graph(self, formatting_config):
+@functools.lru_cache(maxsize=1024)
+def _reformat_type(t):
+    return t.lower().replace('__', '')
 
-        try:
-            import graph_notebook.magics.graph_magic
-            from graph_notebook.magics import Graph
-            from graph_notebook.options import OPTIONS_DEFAULT_DIRECTED, vis_options_merge
-            from graph_notebook.magics.graph_magic import encode_html_chars
-            from graph_notebook.visualization.rows_and_columns import opencypher_get_rows_and_columns
-        except ImportError as e:
-            raise ImportError(
-                "graph_notebook package not found, install with 'pip install graph_notebook'"
-            ) from e
-        
-        def oc_results_df(oc_res, oc_res_format: str = None):
-
-            def reformat_label(l):
-                for label in LABELS_TO_REFORMAT:
-                    if l.startswith(f'__{label}'):
-                        return label
-                return l
-                
-            
-            results = []
-            
-            for result in oc_res['results']:
-                for e in result['p']:
-                    if e['~entityType'] == 'node':
-                        e['~labels'] = [reformat_label(l) for l in e['~labels']]
-                    else:
-                        e['~type'] = e['~type'].lower().replace('__', '')
-                results.append(result)
-                
-            oc_res['results'] = results
-            
-            
-            rows_and_columns = opencypher_get_rows_and_columns(oc_res, oc_res_format)
-            if rows_and_columns:
-                results_df = pd.DataFrame(rows_and_columns['rows']).convert_dtypes()
-                results_df = results_df.astype(str)
-                results_df = results_df.map(lambda x: encode_html_chars(x))
-                col_0_value = range(1, len(results_df) + 1)
-                results_df.insert(0, "#", col_0_value)
-                for col_index, col_name in enumerate(rows_and_columns['columns']):
-                    results_df.rename({results_df.columns[col_index + 1]: col_name},
-                                      axis='columns',
-                                      inplace=True)
-                has_results = True
-            else:
-                results_df = None
-                has_results = False
-            return results_df, has_results
-        
-        def _graph_notebook_vis_options(self, line='', cell='', local_ns: dict = None):
-            parser = argparse.ArgumentParser()
-            parser.add_argument('--silent', action='store_true', default=False, help="Display no output.")
-            parser.add_argument('--store-to', type=str, default='', help='store visualization settings to this variable')
-            parser.add_argument('--load-from', type=str, default='', help='load visualization settings from this variable')
-            line_args = line.split()
-            if line_args:
-                if line_args[0] == 'reset':
-                    line = 'reset'
-                    if len(line_args) > 1:
-                        line_args = line_args[1:]
-                    else:
-                        line_args = []
-            args = parser.parse_args(line_args)
-    
-            if line == 'reset':
-                self.graph_notebook_vis_options = OPTIONS_DEFAULT_DIRECTED
-    
-            if cell == '' and not args.load_from:
-                if not args.silent:
-                    print(json.dumps(self.graph_notebook_vis_options, indent=2))
-            else:
-                try:
-                    if args.load_from:
-                        try:
-                            options_raw = local_ns[args.load_from]
-                            if isinstance(options_raw, dict):
-                                options_raw = json.dumps(options_raw)
-                            options_dict = json.loads(options_raw)
-                        except KeyError:
-                            print(f"Unable to load visualization settings, variable [{args.load_from}] does not exist in "
-                                  f"the local namespace.")
-                            return
-                    else:
-                        options_dict = json.loads(cell)
-                except (JSONDecodeError, TypeError) as e:
-                    print(f"Unable to load visualization settings, variable [{args.load_from}] is not in valid JSON "
-                          f"format:\n")
-                    print(e)
-                    return
-                self.graph_notebook_vis_options = vis_options_merge(self.graph_notebook_vis_options, options_dict)
-                print("Visualization settings successfully changed to:\n")
-                print(json.dumps(self.graph_notebook_vis_options, indent=2))
-    
-        
-        
-        graph_notebook.magics.graph_magic.oc_results_df = oc_results_df
-        setattr(Graph, '_graph_notebook_vis_options', _graph_notebook_vis_options)
-
-        g = Graph(None) 
-        g._graph_notebook_vis_options('reset', cell=formatting_config, local_ns={})
-
-        return g
-
-    def _display(self, cypher, edge_display_property:str=None):
-        
-        face = 'FontAwesome' if self.nb_classic else "'Font Awesome 5 Free'"
-        
-        formatting_config = self.formatting_config or f'''
-        {{  
-          "physics": {{
+_FORMATTING_CONFIG_TMPL = '''
+        {  
+          "physics": {
             "simulationDuration": 1500,
             "disablePhysicsAfterInitialSimulation": false,
             "minVelocity": 0.75,
-            "barnesHut": {{
+            "barnesHut": {
               "centralGravity": 0.3,
               "gravitationalConstant": -10000,
               "springLength": 95,
               "springConstant": 0.04,
               "damping": 0.09,
               "avoidOverlap": 0.1
-            }},
+            },
             "solver": "barnesHut",
             "enabled": true,
             "adaptiveTimestep": true,
-            "stabilization": {{
+            "stabilization": {
               "enabled": true,
               "iterations": 1
-            }}
-          }},
-          "nodes": {{
+            }
+          },
+          "nodes": {
                "shape": "icon",
-               "icon": {{
-                 "face": "{face}",
+               "icon": {
+                 "face": "%(face)s",
                  "weight": "bold",
                  "code": "\uf1b2",
                  "color": "#ff9900",
                  "size": 80
-               }}
-          }},
-          "groups": {{
-            "Source": {{
+               }
+          },
+          "groups": {
+            "Source": {
               "shape": "icon",
-              "icon": {{
-                "face": "{face}",
+              "icon": {
+                "face": "%(face)s",
                 "weight": "bold",
                 "code": "\uf15b",
                 "color": "#336699",
                 "size": 100
-              }}
-            }},
-            "Chunk": {{
+              }
+            },
+            "Chunk": {
               "shape": "icon",
-              "icon": {{
-                "face": "{face}",
+              "icon": {
+                "face": "%(face)s",
                 "weight": "bold",
                 "code": "\uf249",
                 "color": "#336699",
                 "size": 60
-              }}
-            }},
-            "Topic": {{
+              }
+            },
+            "Topic": {
               "shape": "icon",
-              "icon": {{
-                "face": "{face}",
+              "icon": {
+                "face": "%(face)s",
                 "weight": "bold",
                 "code": "\uf07b",
                 "color": "#669900",
                 "size": 100
-              }}
-            }},
-            "Statement": {{
+              }
+            },
+            "Statement": {
               "shape": "icon",
-              "icon": {{
-                "face": "{face}",
+              "icon": {
+                "face": "%(face)s",
                 "weight": "bold",
                 "code": "\uf0ce",
                 "color": "#99cc00",
                 "size": 60
-              }}
-            }},
-            "Fact": {{
+              }
+            },
+            "Fact": {
               "shape": "icon",
-              "icon": {{
-                "face": "{face}",
+              "icon": {
+                "face": "%(face)s",
                 "weight": "bold",
                 "code": "\uf1b3",
                 "color": "#99cc00",
                 "size": 50
-              }}
-            }},
-            "Entity": {{
+              }
+            },
+            "Entity": {
               "shape": "icon",
-              "icon": {{
-                "face": "{face}",
+              "icon": {
+                "face": "%(face)s",
                 "weight": "bold",
                 "code": "\uf1b2",
                 "color": "#ff9900",
                 "size": 80
-              }}
-            }}
-          }}
-        }}
+              }
+            }
+          }
+        }
         '''
 
+_FORMATTING_CLASSIC = _FORMATTING_CONFIG_TMPL % {'face': 'FontAwesome'}
+_FORMATTING_MODERN = _FORMATTING_CONFIG_TMPL % {'face': "'Font Awesome 5 Free'"}
+
+_gn = None
+
+def _graph_notebook():
+
+    # Resolve the optional graph_notebook bindings once, on first use
+    global _gn
+    
+    if _gn is None:
+        try:
+            import graph_notebook.magics.graph_magic as graph_magic
+            from graph_notebook.magics import Graph
+            from graph_notebook.options import OPTIONS_DEFAULT_DIRECTED, vis_options_merge
+            from graph_notebook.visualization.rows_and_columns import opencypher_get_rows_and_columns
+        except ImportError as e:
+            raise ImportError(
+                "graph_notebook package not found, install with 'pip install graph_notebook'"
+            ) from e
+        
+        _gn = SimpleNamespace(
+            graph_magic=graph_magic,
+            Graph=Graph,
+            OPTIONS_DEFAULT_DIRECTED=OPTIONS_DEFAULT_DIRECTED,
+            vis_options_merge=vis_options_merge,
+            opencypher_get_rows_and_columns=opencypher_get_rows_and_columns
+        )
+    
+    return _gn
+
+def _encode_html_chars(value):
+    # Same replacements, in the same order, as graph_notebook's encode_html_chars
+    return (value
+        .replace('&', '&amp;')
+        .replace('<', '&lt;')
+        .replace('>', '&gt;')
+        .replace('"', '&quot;')
+        .replace("'", '&#39;'))
+
+def _oc_results_df(oc_res, oc_res_format: str = None):
+
+    results = []
+
+    for result in oc_res['results']:
+        for e in result['p']:
+            if e['~entityType'] == 'node':
+                e['~labels'] = [_reformat_label(l) for l in e['~labels']]
+            else:
+                e['~type'] = _reformat_type(e['~type'])
+        results.append(result)
+
+    oc_res['results'] = results
+
+    rows_and_columns = _graph_notebook().opencypher_get_rows_and_columns(oc_res, oc_res_format)
+    if rows_and_columns:
+        results_df = pd.DataFrame(rows_and_columns['rows'], dtype=str)
+        results_df = results_df.map(_encode_html_chars, na_action='ignore')
+        col_0_value = range(1, len(results_df) + 1)
+        results_df.insert(0, "#", col_0_value)
+        results_df.columns = ['#', *rows_and_columns['columns']]
+        has_results = True
+    else:
+        results_df = None
+        has_results = False
+    return results_df, has_results
+
+def _graph_notebook_vis_options(self, line='', cell='', local_ns: dict = None):
+
+    gn = _graph_notebook()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--silent', action='store_true', default=False, help="Display no output.")
+    parser.add_argument('--store-to', type=str, default='', help='store visualization settings to this variable')
+    parser.add_argument('--load-from', type=str, default='', help='load visualization settings from this variable')
+    line_args = line.split()
+    if line_args:
+        if line_args[0] == 'reset':
+            line = 'reset'
+            if len(line_args) > 1:
+                line_args = line_args[1:]
+            else:
+                line_args = []
+    args = parser.parse_args(line_args)
+
+    if line == 'reset':
+        self.graph_notebook_vis_options = gn.OPTIONS_DEFAULT_DIRECTED
+
+    if cell == '' and not args.load_from:
+        if not args.silent:
+            print(json.dumps(self.graph_notebook_vis_options, indent=2))
+    else:
+        try:
+            if args.load_from:
+                try:
+                    options_raw = local_ns[args.load_from]
+                    if isinstance(options_raw, dict):
+                        options_raw = json.dumps(options_raw)
+                    options_dict = json.loads(options_raw)
+                except KeyError:
+                    print(f"Unable to load visualization settings, variable [{args.load_from}] does not exist in "
+                          f"the local namespace.")
+                    return
+            else:
+                options_dict = json.loads(cell)
+        except (JSONDecodeError, TypeError) as e:
+            print(f"Unable to load visualization settings, variable [{args.load_from}] is not in valid JSON "
+                  f"format:\n")
+            print(e)
+            return
+        self.graph_notebook_vis_options = gn.vis_options_merge(self.graph_notebook_vis_options, options_dict)
+        print("Visualization settings successfully changed to:\n")
+        print(json.dumps(self.graph_notebook_vis_options, indent=2))
+
+class GraphNotebookVisualisation():
+
+    _patched = False
+
+    def __init__(self, display_edge_labels=False, formatting_config=None, nb_classic=False):
+        self.display_edge_labels = display_edge_labels
+        self.formatting_config = formatting_config
+        self.nb_classic = nb_classic
+        # Configured Graph magics instances, keyed by formatting config
+        self._graphs = {}
+
+    def _get_graph(self, formatting_config):
+
+        g = self._graphs.get(formatting_config)
+        if g is not None:
+            return g
+
+        gn = _graph_notebook()
+
+        if not GraphNotebookVisualisation._patched:
+            # Module-wide patches - only need applying once
+            gn.graph_magic.oc_results_df = _oc_results_df
+            setattr(gn.Graph, '_graph_notebook_vis_options', _graph_notebook_vis_options)
+            GraphNotebookVisualisation._patched = True
+
+        g = gn.Graph(None) 
+        g._graph_notebook_vis_options('reset', cell=formatting_config, local_ns={})
+        
+        self._graphs[formatting_config] = g
+
+        return g
+
+    def _display(self, cypher, params:Optional[Dict]=None, edge_display_property:str=None):
+        
+        if not cypher:
+            print('Nothing to display')
+            return
+        
+        formatting_config = self.formatting_config or (_FORMATTING_CLASSIC if self.nb_classic else _FORMATTING_MODERN)
+
         g = self._get_graph(formatting_config)
 
         if edge_display_property:
@@ -481,43 +576,49 @@ class GraphNotebookVisualisation():
             edge_label_length = 25 if self.display_edge_labels else 0
             line = f'query -d value -l 25 -rel {edge_label_length}'
         
-        g.oc(line, cell=cypher, local_ns={}) 
+        local_ns = {}
+        if params:
+            # %%oc -qp binds the named local_ns variable as the query's $parameters
+            line = f'{line} -qp query_parameters'
+            local_ns['query_parameters'] = params
+        
+        g.oc(line, cell=cypher, local_ns=local_ns) 
     
     def display_results(self, response, include_sources=True):
 
         nodes = response if isinstance(response, list) else response.source_nodes
         query_parameters = get_query_params(nodes)
-        cypher = get_query(query_parameters, include_sources)
+        cypher, params = get_query(query_parameters, include_sources)
         
-        self._display(cypher)
+        self._display(cypher, params)
         
     def display_entity_contexts(self, response):
 
         nodes = response if isinstance(response, list) else response.source_nodes
         query_parameters = get_query_params(nodes)
-        cypher = get_entity_context_query(query_parameters)
+        cypher, params = get_entity_context_query(query_parameters)
         
-        self._display(cypher)
+        self._display(cypher, params)
         
     def display_sources(self, source_ids:Optional[List[str]]=None, filter:Optional[FILTER_TYPE]=None, tenant_id:Optional[str]=None):
 
-        cypher = get_sources_query(to_tenant_id(tenant_id), source_ids, filter)
+        cypher, params = get_sources_query(to_tenant_id(tenant_id), source_ids, filter)
         
-        self._display(cypher)
+        self._display(cypher, params)
         
     def display_entity_paths(self, entity_1:str, entity_2:Optional[str]=None, tenant_id:Optional[str]=None, depth:Optional[int]=3):
         
         if depth < 1 or depth > 3:
             raise ValueError('depth must be between 1-3')
            
-        cypher = get_entity_paths_query(to_tenant_id(tenant_id), entity_1, entity_2, depth)
+        cypher, params = get_entity_paths_query(to_tenant_id(tenant_id), entity_1, entity_2, depth)
         
-        self._display(cypher)
+        self._display(cypher, params)
 
     def display_entities(self, tenant_id:Optional[str]=None):
         cypher = get_entities_query(to_tenant_id(tenant_id))
         
-        self._display(cypher, 'value')
+        self._display(cypher, edge_display_property='value')
         
     def display_schema(self, tenant_id:Optional[str]=None):
         